@@ -7,6 +7,8 @@ Features:
 - Secure config via environment variables
 - Wake-word detection by streaming speech -> keyword matching
 - Text & voice modes (switchable)
+- Pluggable voice input (microphone, WAV file/directory, raw PCM on stdin) and ASR backend
+- Optional memory/CPU profiling mode (--profile, or toggle at runtime with SIGUSR1 / Ctrl+Break)
 - OpenAI integration (uses OPENAI_API_KEY from env)
 - Safe Excel operations via a constrained API (openpyxl)
 - Google search + simple summary (optional)
@@ -27,6 +29,8 @@ import sys
 import asyncio
 import json
 import time
+import signal
+import threading
 import datetime
 import logging
 from typing import Optional, Dict, Any, List
@@ -44,6 +48,12 @@ from googletrans import Translator
 # Excel
 import openpyxl
 
+# Shared command core
+from sophie_core import CommandRouter, percentile
+
+# Runtime profiling (off unless --profile or toggled by signal)
+from sophie_profiler import Profiler
+
 # -------------------------
 # Configuration & Logging
 # -------------------------
@@ -107,16 +117,18 @@ class Memory:
 # TTS (pyttsx3)
 # -------------------------
 class TTS:
-    def __init__(self, voice_index: Optional[int] = None, rate: Optional[int] = 180):
-        self.engine = pyttsx3.init()
-        if voice_index is not None:
+    def __init__(self, voice_index: Optional[int] = None, rate: Optional[int] = 180, muted: bool = False):
+        # muted: log responses only (corpus runs / profiling), never touch the speech engine
+        self.muted = muted
+        self.engine = None if muted else pyttsx3.init()
+        if self.engine is not None and voice_index is not None:
             try:
                 voices = self.engine.getProperty("voices")
                 if 0 <= voice_index < len(voices):
                     self.engine.setProperty("voice", voices[voice_index].id)
             except Exception:
                 pass
-        if rate is not None:
+        if self.engine is not None and rate is not None:
             try:
                 self.engine.setProperty("rate", rate)
             except Exception:
@@ -126,6 +138,8 @@ class TTS:
         if not text:
             return
         log.info("Sophie: %s", text)
+        if self.engine is None:
+            return
         try:
             self.engine.say(text)
             self.engine.runAndWait()
@@ -133,32 +147,208 @@ class TTS:
             log.exception("TTS error: %s", e)
 
 # -------------------------
-# Speech recognition (sync wrapper)
+# Audio sources (where utterances come from)
 # -------------------------
-class SpeechListener:
-    def __init__(self, energy_threshold: int = 300, pause_threshold: float = 0.5, language: str = "en-IN"):
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = energy_threshold
-        self.recognizer.pause_threshold = pause_threshold
-        self.language = language
+class EndOfAudio(Exception):
+    """Raised by a finite audio source once every utterance has been consumed."""
+
+class Utterance:
+    def __init__(self, audio: sr.AudioData, origin: Optional[str] = None):
+        self.audio = audio
+        self.origin = origin  # file path for file-backed sources, None otherwise
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio.frame_data) / float(self.audio.sample_rate * self.audio.sample_width)
+
+class AudioSource:
+    """
+    Produces one Utterance per capture() call. Live sources return None when nothing
+    was heard; finite sources raise EndOfAudio when they run dry.
+    `realtime` is False for sources that can be consumed faster than real time.
+    """
+    realtime = True
+
+    def capture(self, recognizer: sr.Recognizer, timeout: Optional[float] = None,
+                phrase_time_limit: Optional[float] = None) -> Optional[Utterance]:
+        raise NotImplementedError
+
+class MicrophoneSource(AudioSource):
+    def __init__(self, ambient_duration: float = 0.7):
         self.microphone = sr.Microphone()
+        self.ambient_duration = ambient_duration
 
-    def listen_once(self, timeout: Optional[float] = None, phrase_time_limit: Optional[float] = 8.0) -> str:
-        """Listen once and return text. Non-blocking wrapper would need threading — kept simple here."""
+    def capture(self, recognizer, timeout=None, phrase_time_limit=None):
         with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=0.7)
+            recognizer.adjust_for_ambient_noise(source, duration=self.ambient_duration)
             log.debug("Listening (timeout=%s, limit=%s)...", timeout, phrase_time_limit)
-            audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            try:
+                audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+            except sr.WaitTimeoutError:
+                return None
+        return Utterance(audio)
+
+class WavDirectorySource(AudioSource):
+    """Each .wav file (sorted by name) is one utterance; the corpus is played once."""
+    realtime = False
+
+    def __init__(self, paths: List[str]):
+        self.paths = list(paths)
+        self._next = 0
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "WavDirectorySource":
+        names = sorted(n for n in os.listdir(directory) if n.lower().endswith(".wav"))
+        return cls([os.path.join(directory, n) for n in names])
+
+    def capture(self, recognizer, timeout=None, phrase_time_limit=None):
+        if self._next >= len(self.paths):
+            raise EndOfAudio()
+        path = self.paths[self._next]
+        self._next += 1
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        return Utterance(audio, origin=path)
+
+class WavFileSource(WavDirectorySource):
+    def __init__(self, path: str):
+        super().__init__([path])
+
+class StdinPCMSource(AudioSource):
+    """
+    Raw signed little-endian PCM on stdin (e.g. `ffmpeg -f s16le -ac 1 -ar 16000 -`),
+    cut into fixed-length utterances of `chunk_seconds` (or phrase_time_limit, if smaller).
+    """
+    realtime = False
+
+    def __init__(self, sample_rate: int = 16000, sample_width: int = 2, chunk_seconds: float = 4.0, stream=None):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.chunk_seconds = chunk_seconds
+        self.stream = stream if stream is not None else sys.stdin.buffer
+
+    def capture(self, recognizer, timeout=None, phrase_time_limit=None):
+        seconds = min(self.chunk_seconds, phrase_time_limit or self.chunk_seconds)
+        size = int(seconds * self.sample_rate) * self.sample_width
+        data = self.stream.read(size)
+        if not data:
+            raise EndOfAudio()
+        data = data[:len(data) - len(data) % self.sample_width]
+        return Utterance(sr.AudioData(data, self.sample_rate, self.sample_width))
+
+def make_audio_source(spec: Optional[str], pcm_rate: int = 16000) -> AudioSource:
+    """None -> microphone, '-' -> raw PCM on stdin, a directory -> its .wav files, a file -> that .wav file."""
+    if not spec:
+        return MicrophoneSource()
+    if spec == "-":
+        return StdinPCMSource(sample_rate=pcm_rate)
+    if os.path.isdir(spec):
+        return WavDirectorySource.from_directory(spec)
+    if os.path.isfile(spec):
+        return WavFileSource(spec)
+    raise FileNotFoundError(f"audio source not found: {spec}")
+
+# -------------------------
+# Recognizer backends (audio -> text)
+# -------------------------
+class RecognizerBackend:
+    def recognize(self, recognizer: sr.Recognizer, utterance: Utterance) -> str:
+        """Return the transcript, or "" if nothing intelligible was said."""
+        raise NotImplementedError
+
+class GoogleRecognizer(RecognizerBackend):
+    def __init__(self, language: str = "en-IN"):
+        self.language = language
+
+    def recognize(self, recognizer, utterance):
         try:
-            text = self.recognizer.recognize_google(audio, language=self.language)
-            log.info("User said: %s", text)
-            return text
+            return recognizer.recognize_google(utterance.audio, language=self.language)
         except sr.UnknownValueError:
             return ""
         except sr.RequestError as e:
             log.error("Speech recognition request failed: %s", e)
             return ""
 
+class TranscriptStubRecognizer(RecognizerBackend):
+    """
+    Deterministic offline recognizer: the transcript of `clip.wav` is the text in
+    `clip.txt` next to it. Audio without a sidecar (or from stdin) recognizes as "".
+    `delay` adds a fixed per-call latency to stand in for a real ASR service.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def recognize(self, recognizer, utterance):
+        if self.delay:
+            time.sleep(self.delay)
+        if not utterance.origin:
+            return ""
+        sidecar = os.path.splitext(utterance.origin)[0] + ".txt"
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+def make_recognizer_backend(name: str, language: str = "en-IN") -> RecognizerBackend:
+    if name == "stub":
+        return TranscriptStubRecognizer()
+    return GoogleRecognizer(language)
+
+# -------------------------
+# Speech recognition (sync wrapper)
+# -------------------------
+class SpeechListener:
+    def __init__(self, energy_threshold: int = 300, pause_threshold: float = 0.5, language: str = "en-IN",
+                 source: Optional[AudioSource] = None, backend: Optional[RecognizerBackend] = None):
+        self.recognizer = sr.Recognizer()
+        self.recognizer.energy_threshold = energy_threshold
+        self.recognizer.pause_threshold = pause_threshold
+        self.language = language
+        self.source = source if source is not None else MicrophoneSource()
+        self.backend = backend if backend is not None else GoogleRecognizer(language)
+        self.audio_seconds = 0.0  # total audio consumed, for real-time factor reporting
+
+    @property
+    def realtime(self) -> bool:
+        return self.source.realtime
+
+    def listen_once(self, timeout: Optional[float] = None, phrase_time_limit: Optional[float] = 8.0) -> str:
+        """Listen once and return text ("" if nothing recognized). Raises EndOfAudio when a finite source is done."""
+        utterance = self.source.capture(self.recognizer, timeout=timeout, phrase_time_limit=phrase_time_limit)
+        if utterance is None:
+            return ""
+        self.audio_seconds += utterance.duration
+        text = self.backend.recognize(self.recognizer, utterance)
+        if text:
+            log.info("User said: %s", text)
+        return text
+
+class TurnStats:
+    """Wake-word -> response-ready latencies for the voice loop, with TTS time kept separately."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.speech: List[float] = []
+
+    def record(self, seconds: float, speech_seconds: float = 0.0):
+        self.latencies.append(seconds)
+        self.speech.append(speech_seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+        if not lat:
+            return {"turns": 0}
+        return {
+            "turns": len(lat),
+            "mean_ms": round(sum(lat) / len(lat) * 1000, 2),
+            "p50_ms": round(percentile(lat, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(lat, 0.95) * 1000, 2),
+            "max_ms": round(lat[-1] * 1000, 2),
+            "speech_mean_ms": round(sum(self.speech) / len(self.speech) * 1000, 2),
+        }
+
 # -------------------------
 # OpenAI Chat helper (safe wrapper)
 # -------------------------
@@ -285,13 +475,26 @@ def fetch_page_summary(url: str, max_paragraphs: int = 3) -> str:
 # Main Sophie class — orchestrates
 # -------------------------
 class Sophie:
-    def __init__(self, mode: str = "both", wake_word: str = "sophie"):
+    def __init__(self, mode: str = "both", wake_word: str = "sophie", audio_source: Optional[AudioSource] = None,
+                 recognizer_backend: Optional[RecognizerBackend] = None, mute: bool = False):
         self.mode = mode  # "voice", "text", "both"
         self.wake_word = wake_word.lower()
         self.memory = Memory(MEMORY_FILE)
-        self.tts = TTS()
-        self.listener = SpeechListener()
+        self.tts = TTS(muted=mute)
+        self.listener = SpeechListener(source=audio_source, backend=recognizer_backend)
+        self.turn_stats = TurnStats()
         self.translator = Translator()
+        self.router = self._build_router()
+
+    def _build_router(self) -> CommandRouter:
+        r = CommandRouter()
+        r.add("excel", "excel", handler=self._cmd_excel, prefix=True)
+        r.add("open_app", "open notepad", "open calculator", "open chrome", handler=self._cmd_open_app)
+        r.add("time", "time", "date", handler=self._cmd_time)
+        r.add("news", "news", handler=self._cmd_news)
+        r.add("search", "search ", "google ", handler=self._cmd_search, prefix=True)
+        r.add("ask", "gpt:", "ask:", handler=self._cmd_ask, prefix=True)
+        return r
 
     async def start(self):
         log.info("Sophie starting in %s mode (wake word='%s')", self.mode, self.wake_word)
@@ -317,37 +520,129 @@ class Sophie:
         Simple voice loop: listens in short chunks, checks for wake word if not active,
         then captures command and processes it. This is intentionally conservative to avoid
         false positives.
+
+        With a finite audio source (WAV file/directory, stdin PCM) the loop runs the corpus
+        without pacing sleeps, stops when it is exhausted and logs wake-word -> response
+        latency per turn; the summary is also kept in self.turn_stats.
         """
         log.info("Entering voice loop. Say the wake word ('%s') to activate.", self.wake_word)
-        while True:
-            # 1) Listen a short phrase
-            text = self.listener.listen_once(timeout=5, phrase_time_limit=6)
-            if not text:
-                # no speech recognized
-                await asyncio.sleep(0.1)
-                continue
-            text = text.strip()
-            # 2) Check for wake word
-            if self.wake_word in text.lower():
-                self.tts.speak("Yes sir, I'm listening.")
-                # Capture a longer command now
-                cmd = self.listener.listen_once(timeout=8, phrase_time_limit=12)
-                if not cmd:
-                    self.tts.speak("I didn't catch that. Say again.")
+        pace = 1.0 if self.listener.realtime else 0.0
+        started = time.perf_counter()
+        try:
+            while True:
+                # 1) Listen a short phrase
+                text = self.listener.listen_once(timeout=5, phrase_time_limit=6)
+                if not text:
+                    # no speech recognized
+                    await asyncio.sleep(0.1 * pace)
                     continue
-                cmd = cmd.strip()
-                # Process
-                response = await self.handle_user_input(cmd, via_voice=True)
-                self.tts.speak(response)
+                text = text.strip()
+                # 2) Check for wake word
+                if self.wake_word in text.lower():
+                    turn_start = time.perf_counter()
+                    self.tts.speak("Yes sir, I'm listening.")
+                    prompt_speech = time.perf_counter() - turn_start
+                    # Capture a longer command now
+                    cmd = self.listener.listen_once(timeout=8, phrase_time_limit=12)
+                    if not cmd:
+                        self.tts.speak("I didn't catch that. Say again.")
+                        continue
+                    cmd = cmd.strip()
+                    # Process
+                    response = await self.handle_user_input(cmd, via_voice=True)
+                    # latency = wake word -> response ready, excluding time spent speaking the prompt
+                    ready = time.perf_counter()
+                    latency = ready - turn_start - prompt_speech
+                    self.tts.speak(response)
+                    speech = prompt_speech + (time.perf_counter() - ready)
+                    self.turn_stats.record(latency, speech)
+                    log.info("Turn latency: %.1f ms, speaking: %.1f ms (%r)", latency * 1000, speech * 1000, cmd)
+                else:
+                    # If mode == both, allow text triggers or pass
+                    if self.mode == "both":
+                        # treat as ambient utterance; optionally process short commands
+                        if len(text.split()) <= 3 and any(k in text.lower() for k in ["time", "date", "hello", "hi"]):
+                            response = await self.handle_user_input(text, via_voice=True)
+                            self.tts.speak(response)
+                    # else ignore until wake word
+                await asyncio.sleep(0.05 * pace)
+        except EndOfAudio:
+            elapsed = time.perf_counter() - started
+            report = dict(self.turn_stats.summary(), audio_seconds=round(self.listener.audio_seconds, 3),
+                          wall_seconds=round(elapsed, 3))
+            if elapsed > 0:
+                report["realtime_factor"] = round(self.listener.audio_seconds / elapsed, 2)
+            log.info("Audio source exhausted. Voice loop report: %s", json.dumps(report))
+
+    # -------------------------
+    # Command handlers: handler(text, match, user_input) -> response
+    # -------------------------
+    def _cmd_excel(self, text: str, match, user_input: str) -> str:
+        # Expect: excel: {"op": "...", ...}
+        try:
+            jsonpart = text.partition(":")[2].strip()
+            spec = json.loads(jsonpart)
+            result = perform_excel_task(spec)
+            return json.dumps(result, ensure_ascii=False)
+        except Exception as e:
+            log.exception("Excel parsing error")
+            return "I couldn't parse the Excel command. Use: excel: {json-spec}"
+
+    def _cmd_open_app(self, text: str, match, user_input: str) -> str:
+        target = match.group(0).lower()
+        if "notepad" in target:
+            if sys.platform.startswith("win"):
+                os.system("start notepad")
+                return "Opened Notepad."
             else:
-                # If mode == both, allow text triggers or pass
-                if self.mode == "both":
-                    # treat as ambient utterance; optionally process short commands
-                    if len(text.split()) <= 3 and any(k in text.lower() for k in ["time", "date", "hello", "hi"]):
-                        response = await self.handle_user_input(text, via_voice=True)
-                        self.tts.speak(response)
-                # else ignore until wake word
-            await asyncio.sleep(0.05)
+                return "Notepad command works only on Windows."
+        if "calculator" in target:
+            if sys.platform.startswith("win"):
+                os.system("start calc")
+                return "Opened Calculator."
+            else:
+                return "Calculator command platform-dependent."
+        # open default browser to Google homepage
+        import webbrowser
+        webbrowser.open("https://www.google.com")
+        return "Opened browser."
+
+    def _cmd_time(self, text: str, match, user_input: str) -> str:
+        now = datetime.datetime.now()
+        if "time" in text.lower():
+            return f"The time is {now.strftime('%H:%M:%S')}."
+        else:
+            return f"Today is {now.strftime('%A, %d %B %Y')}."
+
+    def _cmd_news(self, text: str, match, user_input: str) -> str:
+        q = text.replace("news", "").strip() or "latest news"
+        sres = google_search_and_summary(q, num_results=2)
+        if not sres.get("ok"):
+            return "I couldn't fetch news right now."
+        lines = [f"{i+1}. {r['title']}" for i, r in enumerate(sres.get("results", []))]
+        return "Here are top results: " + " | ".join(lines)
+
+    def _cmd_search(self, text: str, match, user_input: str) -> str:
+        q = text.split(" ", 1)[1]
+        sres = google_search_and_summary(q, num_results=3)
+        if not sres.get("ok"):
+            return "Search failed."
+        results = sres.get("results", [])
+        if not results:
+            return "No results found."
+        # Fetch summary for first result (safe bounded)
+        first = results[0]
+        summary = fetch_page_summary(first.get("href") or "", max_paragraphs=2)
+        return f"{first.get('title')} — {summary}"
+
+    async def _cmd_ask(self, text: str, match, user_input: str) -> str:
+        prompt = text.partition(":")[2].strip()
+        if not prompt:
+            return "Provide a prompt after 'gpt:'"
+        answer = await chat_with_openai(prompt)
+        # Save conversation
+        self.memory.append(user_input, answer)
+        return answer
 
     async def handle_user_input(self, user_input: str, via_voice: bool = False) -> str:
         """
@@ -371,78 +666,12 @@ class Sophie:
             except Exception:
                 pass
 
-        # COMMAND: Excel safe tasks (JSON-ish commands)
-        if text.lower().startswith("excel"):
-            # Expect: excel: {"op": "...", ...}
-            try:
-                jsonpart = text.partition(":")[2].strip()
-                spec = json.loads(jsonpart)
-                result = perform_excel_task(spec)
-                return json.dumps(result, ensure_ascii=False)
-            except Exception as e:
-                log.exception("Excel parsing error")
-                return "I couldn't parse the Excel command. Use: excel: {json-spec}"
-
-        # COMMAND: open app (limited, safe)
-        if any(kw in text.lower() for kw in ("open notepad", "open calculator", "open chrome")):
-            if "notepad" in text.lower():
-                if sys.platform.startswith("win"):
-                    os.system("start notepad")
-                    return "Opened Notepad."
-                else:
-                    return "Notepad command works only on Windows."
-            if "calculator" in text.lower():
-                if sys.platform.startswith("win"):
-                    os.system("start calc")
-                    return "Opened Calculator."
-                else:
-                    return "Calculator command platform-dependent."
-            if "chrome" in text.lower():
-                # open default browser to Google homepage
-                import webbrowser
-                webbrowser.open("https://www.google.com")
-                return "Opened browser."
-
-        # COMMAND: time/date
-        if any(kw in text.lower() for kw in ("time", "what time", "date", "what date")):
-            now = datetime.datetime.now()
-            if "time" in text.lower():
-                return f"The time is {now.strftime('%H:%M:%S')}."
-            else:
-                return f"Today is {now.strftime('%A, %d %B %Y')}."
-
-        # COMMAND: news (simple search+summary)
-        if "news" in text.lower():
-            q = text.replace("news", "").strip() or "latest news"
-            sres = google_search_and_summary(q, num_results=2)
-            if not sres.get("ok"):
-                return "I couldn't fetch news right now."
-            lines = [f"{i+1}. {r['title']}" for i, r in enumerate(sres.get("results", []))]
-            return "Here are top results: " + " | ".join(lines)
-
-        # COMMAND: web search
-        if text.lower().startswith("search ") or text.lower().startswith("google "):
-            q = text.split(" ", 1)[1]
-            sres = google_search_and_summary(q, num_results=3)
-            if not sres.get("ok"):
-                return "Search failed."
-            results = sres.get("results", [])
-            if not results:
-                return "No results found."
-            # Fetch summary for first result (safe bounded)
-            first = results[0]
-            summary = fetch_page_summary(first.get("href") or "", max_paragraphs=2)
-            return f"{first.get('title')} — {summary}"
-
-        # COMMAND: ask LLM (prefix gpt:)
-        if text.lower().startswith("gpt:") or text.lower().startswith("ask:"):
-            prompt = text.partition(":")[2].strip()
-            if not prompt:
-                return "Provide a prompt after 'gpt:'"
-            answer = await chat_with_openai(prompt)
-            # Save conversation
-            self.memory.append(user_input, answer)
-            return answer
+        # COMMANDS: routed through the shared command core (first match wins)
+        result = self.router.dispatch(text, user_input)
+        if asyncio.iscoroutine(result):
+            result = await result
+        if result is not None:
+            return result
 
         # Fallback: intent classification by a small rule set or LLM
         if len(text) < 200 and sum(len(w) for w in text.split()) < 100:
@@ -481,17 +710,61 @@ def parse_args():
     p = argparse.ArgumentParser(prog="sophie_v2", description="SophieAI v2 assistant")
     p.add_argument("--mode", choices=["text", "voice", "both"], default="both", help="Interaction mode")
     p.add_argument("--wake", default="sophie", help="Wake word")
-    return p.parse_args()
+    p.add_argument("--audio", default=None,
+                   help="Voice input instead of the microphone: a .wav file, a directory of .wav files, or '-' for raw PCM on stdin")
+    p.add_argument("--pcm-rate", type=int, default=16000, help="Sample rate of 16-bit mono PCM read with --audio -")
+    p.add_argument("--recognizer", choices=["google", "stub"], default="google",
+                   help="ASR backend; 'stub' reads transcripts from .txt files next to each .wav")
+    p.add_argument("--mute", action="store_true", help="Log responses instead of speaking them")
+    p.add_argument("--profile", action="store_true",
+                   help="Start with profiling on (it can also be toggled at runtime with SIGUSR1, or Ctrl+Break on Windows)")
+    p.add_argument("--profile-dir", default="./profiles", help="Where profiling dumps are written")
+    p.add_argument("--profile-interval", type=float, default=60.0, help="Seconds between profiling dumps")
+    p.add_argument("--profile-keep", type=int, default=10, help="Number of dumps of each kind to keep")
+    args = p.parse_args()
+    if args.audio and args.audio != "-" and not (os.path.isdir(args.audio) or os.path.isfile(args.audio)):
+        p.error(f"--audio: no such file or directory: {args.audio}")
+    return args
+
+def build_profiler(args, sophie: "Sophie") -> Profiler:
+    """Profiler with Sophie's subsystems registered for memory attribution."""
+    profiler = Profiler(out_dir=args.profile_dir, interval=args.profile_interval, keep=args.profile_keep)
+    profiler.add_subsystem("memory", Memory, safe_load_json, safe_save_json)
+    profiler.add_subsystem("web", google_search_and_summary, fetch_page_summary, "/bs4/", "/requests/", "/urllib3/")
+    profiler.add_subsystem("excel", perform_excel_task, "/openpyxl/")
+    profiler.add_subsystem("openai", chat_with_openai, "/openai/")
+    profiler.add_subsystem("speech", SpeechListener, AudioSource, MicrophoneSource, WavDirectorySource,
+                           StdinPCMSource, GoogleRecognizer, TranscriptStubRecognizer, "/speech_recognition/")
+    profiler.add_subsystem("tts", TTS, "/pyttsx3/")
+    profiler.add_subsystem("translate", "/googletrans/")
+    profiler.add_subsystem("executor", "/concurrent/futures/")
+    profiler.add_gauge("threads", lambda: threading.active_count())
+    profiler.add_gauge("memory.conversations", lambda: len(sophie.memory.data.get("conversations", [])))
+    return profiler
 
 async def main():
     args = parse_args()
-    sophie = Sophie(mode=args.mode, wake_word=args.wake)
+    sophie = Sophie(
+        mode=args.mode,
+        wake_word=args.wake,
+        audio_source=make_audio_source(args.audio, pcm_rate=args.pcm_rate),
+        recognizer_backend=make_recognizer_backend(args.recognizer),
+        mute=args.mute,
+    )
+    profiler = build_profiler(args, sophie)
+    signum = profiler.install_signal_toggle()
+    if signum is not None:
+        log.info("Send %s to toggle profiling.", signal.Signals(signum).name)
+    if args.profile:
+        profiler.start()
     try:
         await sophie.start()
     except KeyboardInterrupt:
         log.info("Shutting down Sophie (KeyboardInterrupt).")
     except Exception:
         log.exception("Unhandled exception in main loop.")
+    finally:
+        profiler.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
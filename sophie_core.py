@@ -0,0 +1,760 @@
+#!/usr/bin/env python3
+"""
+SophieAI command core — shared by the desktop (sophie.py) and mobile (sophie_mobile.py) front-ends.
+
+Contents:
+- CommandRouter: ordered keyword/prefix rules compiled once, first match wins
+- DeviceBackend: interface the mobile commands talk to (Android, fake, ...)
+- AppIndex: cached, fuzzy-searchable index of installed app labels, refreshed incrementally
+- MobileAssistant: the mobile command set, built on the router + a backend
+- CommandPipeline: listen -> recognize -> handle on a background worker, results posted to the UI
+- TTLCache / get_weather: weather responses cached per city
+- FakeBackend: in-memory backend so the whole command path runs on plain Linux
+- HeadlessUI / measure_ui_stall: Kivy-free UI loop for measuring UI-thread stall time
+
+This module only uses the standard library so it can be imported (and benchmarked)
+without Kivy, pyjnius or the speech stack installed:
+
+    python sophie_core.py --apps 500 --iterations 20000
+    python sophie_core.py --stall --turns 20
+"""
+
+import os
+import re
+import math
+import time
+import queue
+import difflib
+import threading
+import logging
+import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, Tuple, Iterable
+
+log = logging.getLogger("SophieAI")
+
+# -------------------------
+# Command router
+# -------------------------
+class Command:
+    """One routing rule: a precompiled pattern plus the handler it dispatches to."""
+
+    __slots__ = ("name", "pattern", "handler")
+
+    def __init__(self, name: str, pattern: "re.Pattern", handler: Callable[..., Any]):
+        self.name = name
+        self.pattern = pattern
+        self.handler = handler
+
+    def __repr__(self):
+        return f"Command({self.name!r}, {self.pattern.pattern!r})"
+
+
+class CommandRouter:
+    """
+    Ordered command table. Rules are checked in registration order and the first
+    match wins, exactly like the old `if/elif "..." in command` chains, but every
+    rule's keywords are compiled into a single regex up front.
+    """
+
+    def __init__(self):
+        self._commands: List[Command] = []
+
+    def add(self, name: str, *keywords: str, handler: Callable[..., Any], prefix: bool = False) -> Command:
+        """
+        Register `handler` for any of `keywords`. By default a keyword matches anywhere
+        in the text (substring); with prefix=True it must start the text.
+        The handler is called as handler(text, match, *args).
+        """
+        if not keywords:
+            raise ValueError("at least one keyword is required")
+        alternation = "|".join(re.escape(k) for k in keywords)
+        pattern = re.compile(("^(?:%s)" if prefix else "(?:%s)") % alternation, re.IGNORECASE)
+        cmd = Command(name, pattern, handler)
+        self._commands.append(cmd)
+        return cmd
+
+    def match(self, text: str) -> Optional[Tuple[Command, "re.Match"]]:
+        for cmd in self._commands:
+            m = cmd.pattern.search(text)
+            if m is not None:
+                return cmd, m
+        return None
+
+    def dispatch(self, text: str, *args, default: Any = None) -> Any:
+        """Run the first matching handler and return its result (or `default` if nothing matched)."""
+        found = self.match(text)
+        if found is None:
+            return default
+        cmd, m = found
+        log.debug("Command '%s' matched: %s", cmd.name, text)
+        return cmd.handler(text, m, *args)
+
+    @property
+    def commands(self) -> List[Command]:
+        return list(self._commands)
+
+# -------------------------
+# Device backend interface
+# -------------------------
+class DeviceBackend:
+    """
+    Everything the mobile command set needs from the device. The Android implementation
+    lives in sophie_mobile.py; FakeBackend below is the in-memory one.
+    """
+
+    def speak(self, text: str):
+        raise NotImplementedError
+
+    def adjust_volume(self, up: bool):
+        raise NotImplementedError
+
+    def set_wifi(self, state: bool):
+        raise NotImplementedError
+
+    def set_bluetooth(self, state: bool):
+        raise NotImplementedError
+
+    def set_flashlight(self, state: bool):
+        raise NotImplementedError
+
+    def clipboard_copy(self, text: str):
+        raise NotImplementedError
+
+    def clipboard_paste(self) -> str:
+        raise NotImplementedError
+
+    # --- apps ---
+    def installed_apps(self) -> Dict[str, str]:
+        """Full scan: {package_name: label}. Expensive on Android — AppIndex calls it as rarely as possible."""
+        raise NotImplementedError
+
+    def changed_packages(self, since: int) -> Tuple[int, Optional[List[str]]]:
+        """
+        Return (sequence_number, package_names changed since `since`).
+        A package list of None means "unknown, do a full rescan".
+        """
+        return since, None
+
+    def app_label(self, package: str) -> Optional[str]:
+        """Label of a single installed package, or None if it is not installed anymore."""
+        return self.installed_apps().get(package)
+
+    def launch_app(self, package: str):
+        raise NotImplementedError
+
+    # --- files & media ---
+    def choose_file(self, on_selection: Callable[[List[str]], None]):
+        raise NotImplementedError
+
+    def storage_dir(self) -> str:
+        raise NotImplementedError
+
+    def play_music(self) -> bool:
+        raise NotImplementedError
+
+    def pause_music(self):
+        raise NotImplementedError
+
+    def resume_music(self):
+        raise NotImplementedError
+
+# -------------------------
+# Installed-app index
+# -------------------------
+class AppIndex:
+    """
+    Cached label index over the backend's installed apps.
+
+    The first lookup does one full scan; after that each refresh() asks the backend
+    only for packages changed since the last sequence number and reloads just those
+    labels. Backends that can't report changes get a full rescan at most every
+    `rescan_interval` seconds, plus one when lookup() misses (at most every
+    `miss_rescan_interval` seconds). find() never touches the backend.
+    """
+
+    def __init__(self, backend: DeviceBackend, fuzzy_cutoff: float = 0.75, rescan_interval: float = 60.0,
+                 miss_rescan_interval: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.rescan_interval = rescan_interval
+        self.miss_rescan_interval = miss_rescan_interval
+        self.clock = clock
+        self._rebuilt_at = 0.0
+        self._incremental = True  # False once the backend said it can't list changed packages
+        self._labels: Dict[str, str] = {}   # package -> original label
+        self._lower: Dict[str, str] = {}    # package -> lowercased label
+        self._by_label: Dict[str, str] = {} # lowercased label -> package
+        self._seq: Optional[int] = None
+
+    def __len__(self):
+        return len(self._labels)
+
+    def _set(self, package: str, label: Optional[str]):
+        old = self._lower.pop(package, None)
+        if old is not None and self._by_label.get(old) == package:
+            del self._by_label[old]
+            # another package may share the label
+            for pkg, low in self._lower.items():
+                if low == old:
+                    self._by_label[old] = pkg
+                    break
+        self._labels.pop(package, None)
+        if label is None:
+            return
+        low = label.lower()
+        self._labels[package] = label
+        self._lower[package] = low
+        self._by_label.setdefault(low, package)
+
+    def rebuild(self):
+        self._labels.clear()
+        self._lower.clear()
+        self._by_label.clear()
+        seq, _ = self.backend.changed_packages(0)
+        for package, label in self.backend.installed_apps().items():
+            self._set(package, label)
+        self._seq = seq
+        self._rebuilt_at = self.clock()
+        log.debug("App index rebuilt: %d apps (seq=%s)", len(self._labels), seq)
+
+    def refresh(self) -> bool:
+        """Bring the index up to date; a no-op when no package changed. Returns True if it did a full rescan."""
+        if self._seq is None:
+            self.rebuild()
+            return True
+        seq, changed = self.backend.changed_packages(self._seq)
+        if changed is None:
+            # "unknown": rescan, rate-limited so every command doesn't cost a full scan
+            self._incremental = False
+            if seq != self._seq or self.clock() - self._rebuilt_at >= self.rescan_interval:
+                self.rebuild()
+                return True
+            return False
+        self._incremental = True
+        for package in changed:
+            self._set(package, self.backend.app_label(package))
+        self._seq = seq
+        return False
+
+    def lookup(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        refresh() then find(). Without change tracking, a miss gets a fresh rescan before
+        giving up, unless the index was rebuilt within the last `miss_rescan_interval` seconds.
+        """
+        rebuilt = self.refresh()
+        found = self.find(query)
+        if (found is None and not rebuilt and not self._incremental
+                and self.clock() - self._rebuilt_at >= self.miss_rescan_interval):
+            self.rebuild()
+            found = self.find(query)
+        return found
+
+    def find(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (package, label) for the best match of `query`:
+        exact label, then label prefix, then substring, then close fuzzy match.
+        """
+        q = query.strip().lower()
+        if not q:
+            return None
+        package = self._by_label.get(q)
+        if package is None:
+            substring = None
+            for pkg, low in self._lower.items():
+                if low.startswith(q):
+                    package = pkg
+                    break
+                if substring is None and q in low:
+                    substring = pkg
+            package = package or substring
+        if package is None:
+            close = difflib.get_close_matches(q, self._by_label.keys(), n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                package = self._by_label[close[0]]
+        if package is None:
+            return None
+        return package, self._labels[package]
+
+# -------------------------
+# Weather
+# -------------------------
+WEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "your_openweathermap_api_key_here")
+WEATHER_CITY = os.getenv("SOPHIE_CITY", "your_city_here")
+WEATHER_TTL = float(os.getenv("SOPHIE_WEATHER_TTL", "600"))  # seconds
+
+_MISSING = object()
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, ttl: float, max_items: int = 128, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.clock = clock
+        self._data: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= self.clock():
+                del self._data[key]
+                return default
+            return entry[1]
+
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_items:
+                # drop the entry closest to expiry
+                del self._data[min(self._data, key=lambda k: self._data[k][0])]
+            self._data[key] = (self.clock() + self.ttl, value)
+
+    def get_or_set(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """Return the cached value or compute, store and return it. Exceptions from `factory` are not cached."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+weather_cache = TTLCache(ttl=WEATHER_TTL)
+
+def fetch_weather(city: str, api_key: str = WEATHER_API_KEY) -> str:
+    """Fetch current weather from OpenWeatherMap (network; raises on failure)."""
+    import requests  # imported lazily so the core stays importable without it
+    url = "http://api.openweathermap.org/data/2.5/weather"
+    r = requests.get(url, params={"q": city, "appid": api_key, "units": "metric"}, timeout=6)
+    r.raise_for_status()
+    weather_data = r.json()
+    temp = weather_data["main"]["temp"]
+    desc = weather_data["weather"][0]["description"]
+    return f"The current temperature in {city} is {temp}°C with {desc}."
+
+def get_weather(city: str = WEATHER_CITY, api_key: str = WEATHER_API_KEY, cache: TTLCache = weather_cache) -> str:
+    """Current weather for `city`, served from `cache` for WEATHER_TTL seconds after each successful fetch."""
+    try:
+        return cache.get_or_set(city.strip().lower(), lambda: fetch_weather(city, api_key))
+    except Exception as e:
+        log.error("Weather fetch failed: %s", e)
+        return "Couldn't fetch the weather."
+
+# -------------------------
+# Mobile command set
+# -------------------------
+_UNMATCHED = object()
+
+class MobileAssistant:
+    """The mobile assistant's commands, independent of Kivy and Android."""
+
+    def __init__(self, backend: DeviceBackend, weather: Callable[[], str] = get_weather):
+        self.backend = backend
+        self.weather = weather
+        self.apps = AppIndex(backend)
+        self.router = self._build_router()
+
+    def speak(self, text: str):
+        self.backend.speak(text)
+
+    def _build_router(self) -> CommandRouter:
+        r = CommandRouter()
+        # Order matters: first match wins (e.g. "turn on wifi" must be tested before "open").
+        r.add("hello", "hello", handler=lambda t, m: self.speak("Hello! How can I assist you?"))
+        r.add("time", "time", handler=lambda t, m: self.speak(f"The time is {datetime.datetime.now().strftime('%I:%M %p')}"))
+        r.add("weather", "weather", handler=lambda t, m: self.report_weather())
+        r.add("volume_up", "volume up", handler=lambda t, m: self.adjust_volume(True))
+        r.add("volume_down", "volume down", handler=lambda t, m: self.adjust_volume(False))
+        r.add("wifi_on", "turn on wifi", handler=lambda t, m: self.toggle_wifi(True))
+        r.add("wifi_off", "turn off wifi", handler=lambda t, m: self.toggle_wifi(False))
+        r.add("bluetooth_on", "turn on bluetooth", handler=lambda t, m: self.toggle_bluetooth(True))
+        r.add("bluetooth_off", "turn off bluetooth", handler=lambda t, m: self.toggle_bluetooth(False))
+        r.add("flashlight_on", "turn on flashlight", handler=lambda t, m: self.toggle_flashlight(True))
+        r.add("flashlight_off", "turn off flashlight", handler=lambda t, m: self.toggle_flashlight(False))
+        r.add("copy", "copy to clipboard", handler=lambda t, m: self.copy_to_clipboard(t.replace(m.group(0), "").strip()))
+        r.add("paste", "paste from clipboard", handler=lambda t, m: self.speak(f"Pasting: {self.backend.clipboard_paste()}"))
+        r.add("open", "open", handler=lambda t, m: self.open_app(t.replace(m.group(0), "").strip()))
+        r.add("move_file", "move file", handler=lambda t, m: self.backend.choose_file(self.move_file_selected))
+        r.add("delete_file", "delete file", handler=lambda t, m: self.backend.choose_file(self.delete_file_selected))
+        r.add("rename_file", "rename file", handler=lambda t, m: self.backend.choose_file(self.rename_file_selected))
+        r.add("play_music", "play music", handler=lambda t, m: self.play_music())
+        r.add("pause_music", "pause music", handler=lambda t, m: self.pause_music())
+        r.add("resume_music", "resume music", handler=lambda t, m: self.resume_music())
+        return r
+
+    def process_command(self, command: str):
+        """Route a recognized (lower-cased) command to its handler."""
+        if self.router.dispatch(command, default=_UNMATCHED) is _UNMATCHED:
+            self.speak("I'm still learning!")
+
+    # --- handlers ---
+    def report_weather(self):
+        self.speak("Fetching weather data...")
+        self.speak(self.weather())
+
+    def adjust_volume(self, up: bool):
+        self.backend.adjust_volume(up)
+        self.speak("Volume increased" if up else "Volume decreased")
+
+    def toggle_wifi(self, state: bool):
+        self.backend.set_wifi(state)
+        self.speak(f"WiFi {'enabled' if state else 'disabled'}")
+
+    def toggle_bluetooth(self, state: bool):
+        self.backend.set_bluetooth(state)
+        self.speak("Bluetooth enabled" if state else "Bluetooth disabled")
+
+    def toggle_flashlight(self, state: bool):
+        self.backend.set_flashlight(state)
+        self.speak("Flashlight turned on" if state else "Flashlight turned off")
+
+    def copy_to_clipboard(self, text: str):
+        self.backend.clipboard_copy(text)
+        self.speak("Text copied to clipboard")
+
+    def open_app(self, app_name: str):
+        found = self.apps.lookup(app_name)
+        if found is None:
+            self.speak("App not found")
+            return
+        package, label = found
+        self.backend.launch_app(package)
+        self.speak(f"Opening {label}")
+
+    def move_file_selected(self, selection: List[str]):
+        if selection:
+            new_path = os.path.join(self.backend.storage_dir(), "NewFolder", os.path.basename(selection[0]))
+            os.rename(selection[0], new_path)
+            self.speak("File moved successfully")
+
+    def delete_file_selected(self, selection: List[str]):
+        if selection:
+            os.remove(selection[0])
+            self.speak("File deleted successfully")
+
+    def rename_file_selected(self, selection: List[str]):
+        if selection:
+            new_name = "renamed_file.txt"
+            os.rename(selection[0], os.path.join(os.path.dirname(selection[0]), new_name))
+            self.speak("File renamed successfully")
+
+    def play_music(self):
+        if self.backend.play_music():
+            self.speak("Playing music")
+        else:
+            self.speak("No music found")
+
+    def pause_music(self):
+        self.backend.pause_music()
+        self.speak("Music paused")
+
+    def resume_music(self):
+        self.backend.resume_music()
+        self.speak("Music resumed")
+
+# -------------------------
+# Background command pipeline
+# -------------------------
+class CommandPipeline:
+    """
+    Runs one voice interaction off the UI thread:
+
+        listen()  -> capture + ASR, returns the command text (worker thread)
+        on_heard(text)                                      (posted to UI)
+        handle(text) -> command processing, network calls    (worker thread)
+        on_error(exc) if any stage raised                   (posted to UI)
+
+    `post(fn, *args)` must schedule fn on the UI thread (Kivy: Clock.schedule_once).
+    A single worker keeps interactions — and the command state they touch — serialized;
+    submit() while one is in flight is ignored. Exceptions listed in `expected` (e.g.
+    "didn't understand" / "didn't hear" from the ASR) are logged at debug level; anything
+    else is logged with its traceback. Both are posted to on_error.
+    """
+
+    def __init__(self, listen: Callable[[], str], handle: Callable[[str], Any],
+                 post: Callable[..., None], on_heard: Optional[Callable[[str], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, expected: Tuple[type, ...] = ()):
+        self.listen = listen
+        self.handle = handle
+        self.post = post
+        self.on_heard = on_heard
+        self.on_error = on_error
+        self.expected = tuple(expected)
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="sophie-cmd")
+        self._busy = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._busy.locked()
+
+    def submit(self) -> Optional[Future]:
+        """Start an interaction; returns None if one is already running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            return self._executor.submit(self._run)
+        except Exception:
+            self._busy.release()
+            raise
+
+    def _run(self):
+        try:
+            text = self.listen()
+            if self.on_heard is not None:
+                self.post(self.on_heard, text)
+            self.handle(text)
+        except Exception as e:
+            if isinstance(e, self.expected):
+                log.debug("Command pipeline: %s", type(e).__name__)
+            else:
+                log.exception("Command pipeline error: %s", e)
+            if self.on_error is not None:
+                self.post(self.on_error, e)
+        finally:
+            self._busy.release()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+# -------------------------
+# Fake backend (tests / benchmarks on plain Linux)
+# -------------------------
+class FakeBackend(DeviceBackend):
+    """
+    In-memory device. Every call is recorded in `calls` and spoken text in `spoken`;
+    `install()` / `uninstall()` bump a sequence number the way Android's
+    PackageManager.getChangedPackages() does.
+    """
+
+    def __init__(self, apps: Optional[Dict[str, str]] = None, selection: Optional[List[str]] = None,
+                 storage: str = "/tmp"):
+        self.apps: Dict[str, str] = dict(apps or {})
+        self.selection = list(selection or [])
+        self.storage = storage
+        self.clipboard = ""
+        self.spoken: List[str] = []
+        self.calls: List[Tuple[str, Any]] = []
+        self.full_scans = 0
+        self._seq = 1
+        self._changes: List[Tuple[int, str]] = []
+
+    def _record(self, name: str, arg: Any = None):
+        self.calls.append((name, arg))
+
+    def speak(self, text: str):
+        self.spoken.append(text)
+
+    def adjust_volume(self, up: bool):
+        self._record("adjust_volume", up)
+
+    def set_wifi(self, state: bool):
+        self._record("set_wifi", state)
+
+    def set_bluetooth(self, state: bool):
+        self._record("set_bluetooth", state)
+
+    def set_flashlight(self, state: bool):
+        self._record("set_flashlight", state)
+
+    def clipboard_copy(self, text: str):
+        self.clipboard = text
+
+    def clipboard_paste(self) -> str:
+        return self.clipboard
+
+    def install(self, package: str, label: str):
+        self.apps[package] = label
+        self._seq += 1
+        self._changes.append((self._seq, package))
+
+    def uninstall(self, package: str):
+        self.apps.pop(package, None)
+        self._seq += 1
+        self._changes.append((self._seq, package))
+
+    def installed_apps(self) -> Dict[str, str]:
+        self.full_scans += 1
+        return dict(self.apps)
+
+    def changed_packages(self, since: int) -> Tuple[int, Optional[List[str]]]:
+        return self._seq, [pkg for seq, pkg in self._changes if seq > since]
+
+    def app_label(self, package: str) -> Optional[str]:
+        return self.apps.get(package)
+
+    def launch_app(self, package: str):
+        self._record("launch_app", package)
+
+    def choose_file(self, on_selection: Callable[[List[str]], None]):
+        on_selection(list(self.selection))
+
+    def storage_dir(self) -> str:
+        return self.storage
+
+    def play_music(self) -> bool:
+        self._record("play_music")
+        return True
+
+    def pause_music(self):
+        self._record("pause_music")
+
+    def resume_music(self):
+        self._record("resume_music")
+
+# -------------------------
+# Headless UI harness
+# -------------------------
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile (0 <= q <= 1) of an already sorted, non-empty list."""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+class HeadlessUI:
+    """
+    Stand-in for the Kivy main loop. post() queues callbacks from any thread;
+    pump() runs them on the calling ("UI") thread and records how long each one
+    held it in `stalls`.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[Callable[..., Any], tuple]]" = queue.Queue()
+        self.stalls: List[float] = []
+
+    def post(self, fn: Callable[..., Any], *args):
+        self._queue.put((fn, args))
+
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn on the UI thread now, timing it like any other callback."""
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.stalls.append(time.perf_counter() - start)
+
+    def pump(self, timeout: float = 0.0) -> int:
+        """Run queued callbacks; wait up to `timeout` for the first one. Returns how many ran."""
+        ran = 0
+        try:
+            fn, args = self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return 0
+        while True:
+            self.run(fn, *args)
+            ran += 1
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                return ran
+
+class _PostingBackend(FakeBackend):
+    """FakeBackend whose speak() goes through the UI queue, like the Kivy label update does."""
+
+    def __init__(self, ui: HeadlessUI, apps: Optional[Dict[str, str]] = None):
+        super().__init__(apps)
+        self.ui = ui
+
+    def speak(self, text: str):
+        self.ui.post(self.spoken.append, text)
+
+STALL_COMMANDS = ("what's the weather", "turn on wifi", "open camera", "hello", "volume up")
+
+def measure_ui_stall(turns: int = 20, capture_delay: float = 0.05, asr_delay: float = 0.05,
+                     network_delay: float = 0.1, asynchronous: bool = True) -> Dict[str, Any]:
+    """
+    Simulate `turns` button presses with sleeps standing in for microphone capture,
+    ASR and the weather request, and report how long the UI thread was blocked.
+    asynchronous=False runs everything inside the button callback, like the old app did.
+    """
+    ui = HeadlessUI()
+    backend = _PostingBackend(ui, {"com.android.camera": "Camera"})
+    cache = TTLCache(ttl=WEATHER_TTL)
+    network_calls = []
+
+    def slow_weather() -> str:
+        network_calls.append(1)
+        time.sleep(network_delay)
+        return "Sunny, 25°C."
+
+    assistant = MobileAssistant(backend, weather=lambda: cache.get_or_set("test city", slow_weather))
+    heard = iter([STALL_COMMANDS[i % len(STALL_COMMANDS)] for i in range(turns)])
+
+    def listen() -> str:
+        time.sleep(capture_delay)
+        time.sleep(asr_delay)
+        return next(heard)
+
+    start = time.perf_counter()
+    if asynchronous:
+        pipeline = CommandPipeline(listen, assistant.process_command, ui.post, on_heard=lambda text: None)
+        for _ in range(turns):
+            ui.run(pipeline.submit)
+            while pipeline.busy:
+                ui.pump(timeout=0.005)
+            ui.pump()
+        pipeline.shutdown()
+    else:
+        for _ in range(turns):
+            ui.run(lambda: assistant.process_command(listen()))
+            ui.pump()
+    elapsed = time.perf_counter() - start
+    stalls = sorted(ui.stalls)
+    return {
+        "mode": "async" if asynchronous else "sync",
+        "turns": turns,
+        "seconds": round(elapsed, 4),
+        "ui_callbacks": len(stalls),
+        "ui_blocked_seconds": round(sum(stalls), 6),
+        "max_stall_ms": round(stalls[-1] * 1000, 3) if stalls else 0.0,
+        "p95_stall_ms": round(percentile(stalls, 0.95) * 1000, 3) if stalls else 0.0,
+        "weather_requests": len(network_calls),
+        "responses": len(backend.spoken),
+    }
+
+# -------------------------
+# Benchmark
+# -------------------------
+BENCH_COMMANDS = (
+    "hello sophie", "what time is it", "volume up", "turn on wifi", "turn off bluetooth",
+    "copy to clipboard hello world", "open app 250", "open camera", "open nonexistent thing",
+    "pause music", "sing me a song",
+)
+
+def benchmark(num_apps: int = 500, iterations: int = 20000,
+              commands: Iterable[str] = BENCH_COMMANDS) -> Dict[str, Any]:
+    """Run `iterations` commands through MobileAssistant on a FakeBackend and report throughput."""
+    apps = {f"com.example.app{i}": f"App {i}" for i in range(num_apps)}
+    apps["com.android.camera"] = "Camera"
+    backend = FakeBackend(apps)
+    assistant = MobileAssistant(backend, weather=lambda: "Sunny.")
+    commands = list(commands)
+    start = time.perf_counter()
+    for i in range(iterations):
+        assistant.process_command(commands[i % len(commands)])
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "apps": num_apps,
+        "seconds": round(elapsed, 4),
+        "commands_per_sec": round(iterations / elapsed) if elapsed else None,
+        "full_app_scans": backend.full_scans,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    p = argparse.ArgumentParser(description="Benchmark the SophieAI command core on a fake device")
+    p.add_argument("--apps", type=int, default=500, help="Number of fake installed apps")
+    p.add_argument("--iterations", type=int, default=20000, help="Commands to process")
+    p.add_argument("--stall", action="store_true", help="Measure UI-thread stall time instead (sync vs async)")
+    p.add_argument("--turns", type=int, default=20, help="Voice interactions to simulate with --stall")
+    args = p.parse_args()
+    if args.stall:
+        report = [measure_ui_stall(args.turns, asynchronous=False), measure_ui_stall(args.turns, asynchronous=True)]
+    else:
+        report = benchmark(args.apps, args.iterations)
+    print(json.dumps(report, indent=2))
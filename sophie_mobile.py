@@ -1,14 +1,16 @@
 from kivy.app import App
+from kivy.clock import Clock, mainthread
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 import speech_recognition as sr
 import pyttsx3
-import requests
 from plyer import tts, notification, filechooser, clipboard
 from jnius import autoclass
 import os
 
+from sophie_core import DeviceBackend, MobileAssistant, CommandPipeline
+
 # Access Android-specific features
 Intent = autoclass('android.content.Intent')
 PythonActivity = autoclass('org.kivy.android.PythonActivity')
@@ -19,216 +21,174 @@ AudioManager = autoclass('android.media.AudioManager')
 BluetoothAdapter = autoclass('android.bluetooth.BluetoothAdapter')
 CameraManager = autoclass('android.hardware.camera2.CameraManager')
 
-class SophieApp(App):
-    def build(self):
-        layout = BoxLayout(orientation='vertical')
+MUSIC_EXTENSIONS = (".mp3", ".m4a", ".ogg", ".wav", ".flac")
 
-        self.label = Label(text="Tap the button and speak...", font_size=20)
-        self.button = Button(text="Listen", font_size=24, on_press=self.listen_command)
+def post_to_ui(fn, *args):
+    """ Run fn(*args) on the Kivy UI thread at the next frame """
+    Clock.schedule_once(lambda dt: fn(*args))
 
-        layout.add_widget(self.label)
-        layout.add_widget(self.button)
+def _to_str(value):
+    """ Java CharSequence / String -> Python str """
+    return value if isinstance(value, str) else value.toString()
 
-        self.engine = pyttsx3.init()
-        self.recognizer = sr.Recognizer()
+class AndroidBackend(DeviceBackend):
+    """ DeviceBackend on top of the Android APIs (via pyjnius) and Plyer """
+
+    def __init__(self, app):
+        self.app = app
+        activity = PythonActivity.mActivity
+        self.context = activity.getApplicationContext()
+        self.package_manager = self.context.getPackageManager()
         self.media_player = MediaPlayer()
-        self.audio_manager = PythonActivity.mActivity.getSystemService("audio")
-        self.camera_manager = PythonActivity.mActivity.getSystemService("camera")
-        self.wifi_manager = PythonActivity.mActivity.getApplicationContext().getSystemService(PythonActivity.mActivity.WIFI_SERVICE)
+        self.audio_manager = activity.getSystemService("audio")
+        self.camera_manager = activity.getSystemService("camera")
+        self.wifi_manager = self.context.getSystemService(activity.WIFI_SERVICE)
         self.bluetooth_adapter = BluetoothAdapter.getDefaultAdapter()
 
-        return layout
-
     def speak(self, text):
-        """ Make Sophie respond with speech and display text """
-        self.label.text = f"Sophie: {text}"
-        tts.speak(text)  # Uses Plyer to speak
+        self.app.speak(text)
 
-    def listen_command(self, instance):
-        """ Capture voice and process command """
-        self.label.text = "Listening..."
-        with sr.Microphone() as source:
-            self.recognizer.adjust_for_ambient_noise(source)
-            audio = self.recognizer.listen(source)
+    def adjust_volume(self, up):
+        direction = AudioManager.ADJUST_RAISE if up else AudioManager.ADJUST_LOWER
+        self.audio_manager.adjustVolume(direction, AudioManager.FLAG_SHOW_UI)
 
-        try:
-            command = self.recognizer.recognize_google(audio).lower()
-            self.label.text = f"You said: {command}"
-            self.process_command(command)
-        except sr.UnknownValueError:
-            self.speak("I didn't understand that.")
-        except sr.RequestError:
-            self.speak("Speech service is down.")
-
-    def process_command(self, command):
-        """ Process user commands """
-        if "hello" in command:
-            self.speak("Hello! How can I assist you?")
-
-        elif "time" in command:
-            from datetime import datetime
-            self.speak(f"The time is {datetime.now().strftime('%I:%M %p')}")
-
-        elif "weather" in command:
-            self.speak("Fetching weather data...")
-            weather = self.get_weather()
-            self.speak(weather)
-
-        elif "volume up" in command:
-            self.adjust_volume("up")
+    def set_wifi(self, state):
+        self.wifi_manager.setWifiEnabled(state)
 
-        elif "volume down" in command:
-            self.adjust_volume("down")
+    def set_bluetooth(self, state):
+        if state:
+            self.bluetooth_adapter.enable()
+        else:
+            self.bluetooth_adapter.disable()
 
-        elif "turn on wifi" in command:
-            self.toggle_wifi(True)
+    def set_flashlight(self, state):
+        camera_id = self.camera_manager.getCameraIdList()[0]
+        self.camera_manager.setTorchMode(camera_id, state)
 
-        elif "turn off wifi" in command:
-            self.toggle_wifi(False)
+    def clipboard_copy(self, text):
+        clipboard.copy(text)
 
-        elif "turn on bluetooth" in command:
-            self.toggle_bluetooth(True)
+    def clipboard_paste(self):
+        return clipboard.paste()
 
-        elif "turn off bluetooth" in command:
-            self.toggle_bluetooth(False)
+    def installed_apps(self):
+        """ Full scan — one loadLabel JNI call per app, so AppIndex only does this once """
+        pm = self.package_manager
+        return {app.packageName: _to_str(app.loadLabel(pm)) for app in pm.getInstalledApplications(0)}
 
-        elif "turn on flashlight" in command:
-            self.toggle_flashlight(True)
+    def changed_packages(self, since):
+        """ PackageManager.getChangedPackages (API 26+); older devices report "unknown" """
+        try:
+            changed = self.package_manager.getChangedPackages(since)
+        except Exception:
+            return since, None
+        if changed is None:
+            return since, []
+        return changed.getSequenceNumber(), [_to_str(name) for name in changed.getPackageNames()]
+
+    def app_label(self, package):
+        pm = self.package_manager
+        try:
+            return _to_str(pm.getApplicationInfo(package, 0).loadLabel(pm))
+        except Exception:
+            return None  # NameNotFoundException: uninstalled
 
-        elif "turn off flashlight" in command:
-            self.toggle_flashlight(False)
+    def launch_app(self, package):
+        intent = Intent(Intent.ACTION_MAIN)
+        intent.addCategory(Intent.CATEGORY_LAUNCHER)
+        intent.setPackage(package)
+        PythonActivity.mActivity.startActivity(intent)
 
-        elif "copy to clipboard" in command:
-            self.copy_to_clipboard(command.replace("copy to clipboard", "").strip())
+    def choose_file(self, on_selection):
+        filechooser.open_file(on_selection=on_selection)
 
-        elif "paste from clipboard" in command:
-            text = clipboard.paste()
-            self.speak(f"Pasting: {text}")
+    def storage_dir(self):
+        return Environment.getExternalStorageDirectory().getAbsolutePath()
 
-        elif "open" in command:
-            self.open_app(command.replace("open", "").strip())
+    def play_music(self):
+        music_dir = Environment.getExternalStoragePublicDirectory(Environment.DIRECTORY_MUSIC).getAbsolutePath()
+        try:
+            tracks = sorted(f for f in os.listdir(music_dir) if f.lower().endswith(MUSIC_EXTENSIONS))
+        except OSError:
+            tracks = []
+        if not tracks:
+            return False
+        self.media_player.reset()
+        self.media_player.setDataSource(os.path.join(music_dir, tracks[0]))
+        self.media_player.prepare()
+        self.media_player.start()
+        return True
+
+    def pause_music(self):
+        if self.media_player.isPlaying():
+            self.media_player.pause()
+
+    def resume_music(self):
+        self.media_player.start()
 
-        elif "move file" in command:
-            self.move_file()
+class SophieApp(App):
+    def build(self):
+        layout = BoxLayout(orientation='vertical')
 
-        elif "delete file" in command:
-            self.delete_file()
+        self.label = Label(text="Tap the button and speak...", font_size=20)
+        self.button = Button(text="Listen", font_size=24, on_press=self.listen_command)
 
-        elif "rename file" in command:
-            self.rename_file()
+        layout.add_widget(self.label)
+        layout.add_widget(self.button)
 
-        elif "play music" in command:
-            self.play_music()
+        self.engine = pyttsx3.init()
+        self.recognizer = sr.Recognizer()
+        self.assistant = MobileAssistant(AndroidBackend(self))
+        self.pipeline = CommandPipeline(
+            listen=self.capture_command,
+            handle=self.process_command,
+            post=post_to_ui,
+            on_heard=self.show_command,
+            on_error=self.show_error,
+            expected=(sr.UnknownValueError, sr.WaitTimeoutError),
+        )
 
-        elif "pause music" in command:
-            self.pause_music()
+        return layout
 
-        elif "resume music" in command:
-            self.resume_music()
+    def on_stop(self):
+        self.pipeline.shutdown(wait=False)
 
-        else:
-            self.speak("I'm still learning!")
+    @mainthread
+    def speak(self, text):
+        """ Make Sophie respond with speech and display text (safe to call from any thread) """
+        self.label.text = f"Sophie: {text}"
+        tts.speak(text)  # Uses Plyer to speak
 
-    def get_weather(self):
-        """ Fetch weather from OpenWeatherMap (replace 'your_api_key' with actual key) """
-        API_KEY = "your_openweathermap_api_key_here"
-        city = "your_city_here"
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={API_KEY}&units=metric"
-        try:
-            weather_data = requests.get(url).json()
-            temp = weather_data["main"]["temp"]
-            desc = weather_data["weather"][0]["description"]
-            return f"The current temperature in {city} is {temp}°C with {desc}."
-        except:
-            return "Couldn't fetch the weather."
-
-    def adjust_volume(self, direction):
-        """ Adjust volume up or down """
-        if direction == "up":
-            self.audio_manager.adjustVolume(AudioManager.ADJUST_RAISE, AudioManager.FLAG_SHOW_UI)
-            self.speak("Volume increased")
+    def listen_command(self, instance):
+        """ Button handler: start a background capture -> recognize -> process run """
+        if self.pipeline.submit() is not None:
+            self.label.text = "Listening..."
         else:
-            self.audio_manager.adjustVolume(AudioManager.ADJUST_LOWER, AudioManager.FLAG_SHOW_UI)
-            self.speak("Volume decreased")
+            self.label.text = "Still listening..."
 
-    def toggle_wifi(self, state):
-        """ Turn WiFi on or off """
-        self.wifi_manager.setWifiEnabled(state)
-        status = "enabled" if state else "disabled"
-        self.speak(f"WiFi {status}")
+    def capture_command(self):
+        """ Capture voice and recognize it (runs on the pipeline worker) """
+        with sr.Microphone() as source:
+            self.recognizer.adjust_for_ambient_noise(source)
+            audio = self.recognizer.listen(source, timeout=8, phrase_time_limit=12)
+        return self.recognizer.recognize_google(audio).lower()
 
-    def toggle_bluetooth(self, state):
-        """ Turn Bluetooth on or off """
-        if state:
-            self.bluetooth_adapter.enable()
-            self.speak("Bluetooth enabled")
-        else:
-            self.bluetooth_adapter.disable()
-            self.speak("Bluetooth disabled")
+    def show_command(self, command):
+        self.label.text = f"You said: {command}"
 
-    def toggle_flashlight(self, state):
-        """ Turn Flashlight on or off """
-        camera_id = self.camera_manager.getCameraIdList()[0]
-        if state:
-            self.camera_manager.setTorchMode(camera_id, True)
-            self.speak("Flashlight turned on")
+    def show_error(self, error):
+        if isinstance(error, sr.WaitTimeoutError):
+            self.speak("I didn't hear anything.")
+        elif isinstance(error, sr.UnknownValueError):
+            self.speak("I didn't understand that.")
+        elif isinstance(error, sr.RequestError):
+            self.speak("Speech service is down.")
         else:
-            self.camera_manager.setTorchMode(camera_id, False)
-            self.speak("Flashlight turned off")
-
-    def copy_to_clipboard(self, text):
-        """ Copy text to clipboard """
-        clipboard.copy(text)
-        self.speak("Text copied to clipboard")
+            self.speak("Something went wrong.")
 
-    def open_app(self, app_name):
-        """ Open apps based on user command """
-        intent = Intent(Intent.ACTION_MAIN)
-        intent.addCategory(Intent.CATEGORY_LAUNCHER)
-        context = PythonActivity.mActivity.getApplicationContext()
-        package_manager = context.getPackageManager()
-        app_list = package_manager.getInstalledApplications(0)
-
-        for app in app_list:
-            if app_name.lower() in app.loadLabel(package_manager).lower():
-                intent.setPackage(app.packageName)
-                PythonActivity.mActivity.startActivity(intent)
-                self.speak(f"Opening {app_name}")
-                return
-
-        self.speak("App not found")
-
-    def move_file(self):
-        """ Move a file using file chooser """
-        filechooser.open_file(on_selection=self.move_file_selected)
-
-    def move_file_selected(self, selection):
-        """ Handle file move operation """
-        if selection:
-            new_path = os.path.join(Environment.getExternalStorageDirectory().getAbsolutePath(), "NewFolder", os.path.basename(selection[0]))
-            os.rename(selection[0], new_path)
-            self.speak("File moved successfully")
-
-    def delete_file(self):
-        """ Delete a file """
-        filechooser.open_file(on_selection=self.delete_file_selected)
-
-    def delete_file_selected(self, selection):
-        """ Handle file delete operation """
-        if selection:
-            os.remove(selection[0])
-            self.speak("File deleted successfully")
-
-    def rename_file(self):
-        """ Rename a file """
-        filechooser.open_file(on_selection=self.rename_file_selected)
-
-    def rename_file_selected(self, selection):
-        """ Handle file rename operation """
-        if selection:
-            new_name = "renamed_file.txt"
-            os.rename(selection[0], os.path.join(os.path.dirname(selection[0]), new_name))
-            self.speak("File renamed successfully")
+    def process_command(self, command):
+        """ Process user commands (runs on the pipeline worker; weather is cached per city) """
+        self.assistant.process_command(command)
 
 if __name__ == "__main__":
     SophieApp().run()
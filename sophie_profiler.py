@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+SophieAI runtime profiler — for finding slow memory/CPU growth in long-running sessions.
+
+Contents:
+- StackSampler: background thread sampling every thread's Python stack (sys._current_frames)
+  into collapsed "frame;frame;frame count" lines, the input format of flamegraph.pl / speedscope.
+  On Linux a sample only counts if the thread used CPU since the previous sample (per-thread
+  utime+stime from /proc/self/task/<tid>/stat), so it is a CPU profile; elsewhere it falls back
+  to wall-clock sampling with known blocking frames filtered out
+- MemoryTracker: tracemalloc snapshots diffed against the previous window, with each
+  allocation attributed to a registered subsystem (memory, web, excel, executor, ...)
+- Profiler: ties both together, dumps a window every `interval` seconds into rotating
+  files and can be toggled at runtime (install_signal_toggle)
+
+Only the standard library is used. While disabled nothing runs: tracemalloc is stopped
+and no sampler thread exists.
+"""
+
+import os
+import sys
+import time
+import signal
+import inspect
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+log = logging.getLogger("SophieAI")
+
+# Leaf frames that usually mean "this thread is blocked in C", used by the wall-clock fallback only.
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+    ("subprocess.py", "_wait"),
+    ("pyaudio.py", "read"),
+    ("sophie.py", "loop_text"),          # input()
+}
+
+PROC_TASKS = "/proc/self/task"
+
+def _thread_cpu_ticks(native_id: int) -> Optional[int]:
+    """utime + stime of one thread in clock ticks (Linux), or None if unavailable."""
+    try:
+        with open(f"{PROC_TASKS}/{native_id}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = data[data.rindex(b")") + 2:].split()  # fields[0] is field 3 (state)
+    return int(fields[11]) + int(fields[12])       # fields 14 (utime) and 15 (stime)
+
+# -------------------------
+# CPU: sampling stack profiler
+# -------------------------
+class StackSampler:
+    """
+    Samples all other threads (except the profiler's own) every `interval` seconds and
+    counts collapsed stacks. `clock` is "cpu" when samples are filtered by per-thread CPU
+    time (Linux) and "wall" otherwise; the dump file is named after it.
+    """
+
+    def __init__(self, interval: float = 0.01, include_idle: bool = False, cpu_time: Optional[bool] = None):
+        self.interval = interval
+        self.include_idle = include_idle
+        if cpu_time is None:
+            cpu_time = os.path.isdir(PROC_TASKS) and hasattr(threading.Thread, "native_id")
+        self.clock = "cpu" if cpu_time else "wall"
+        self._ticks: Dict[int, int] = {}  # native thread id -> CPU ticks at the previous sample
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sophie-cpu-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            threads = {t.ident: t for t in threading.enumerate()}
+            frames = sys._current_frames()
+            sampled = []
+            for ident, frame in frames.items():
+                thread = threads.get(ident)
+                name = thread.name if thread is not None else f"thread-{ident}"
+                if ident == own or name.startswith("sophie-profiler"):
+                    continue
+                if not self.include_idle and not self._busy(thread, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                stack.reverse()
+                sampled.append(";".join(stack))
+            del frames
+            with self._lock:
+                self._counts.update(sampled)
+
+    def _busy(self, thread: Optional[threading.Thread], frame) -> bool:
+        if self.clock == "wall":
+            code = frame.f_code
+            return (os.path.basename(code.co_filename), code.co_name) not in IDLE_LEAVES
+        native_id = getattr(thread, "native_id", None)
+        if native_id is None:
+            return False
+        ticks = _thread_cpu_ticks(native_id)
+        if ticks is None:
+            return False
+        previous = self._ticks.get(native_id)
+        self._ticks[native_id] = ticks
+        return previous is not None and ticks > previous
+
+    def drain(self) -> Counter:
+        """Return the stacks counted since the last drain and start a new window."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+# -------------------------
+# Memory: tracemalloc diffs per subsystem
+# -------------------------
+class MemoryTracker:
+    """
+    Takes a tracemalloc snapshot per window and diffs it with the previous one.
+    Each allocation is attributed to the first registered subsystem found walking
+    its traceback from the most recent frame outwards; anything else is "other".
+    """
+
+    def __init__(self, nframes: int = 12):
+        self.nframes = nframes
+        self._rules: List[Tuple[str, Callable[[str, int], bool]]] = []
+        self._paths: Dict[str, str] = {}  # raw filename -> normalized absolute path
+        self._frames: Dict[Tuple[str, int], Optional[str]] = {}  # (raw filename, lineno) -> subsystem or None
+        self._last: Optional[tracemalloc.Snapshot] = None
+        # our own bookkeeping, skipped when reporting (cheaper than Snapshot.filter_traces on big heaps)
+        self._ignore = {tracemalloc.__file__, __file__}
+
+    def add_subsystem(self, name: str, *targets: Any):
+        """
+        Register what belongs to subsystem `name`. A string target matches any file
+        whose path contains it (e.g. "bs4", "concurrent/futures"); a class or function
+        target matches the source lines it spans.
+        """
+        for target in targets:
+            if isinstance(target, str):
+                fragment = os.path.normcase(target.replace("\\", "/")).replace("\\", "/")
+                self._rules.append((name, lambda f, l, frag=fragment: frag in f))
+                continue
+            try:
+                filename = self._normalize(inspect.getsourcefile(target))
+                lines, first = inspect.getsourcelines(target)
+            except (OSError, TypeError):
+                log.debug("Profiler: no source for %r, not attributed", target)
+                continue
+            last = first + len(lines) - 1
+            self._rules.append((name, lambda f, l, fn=filename, a=first, b=last: a <= l <= b and f == fn))
+        self._frames.clear()
+
+    def _normalize(self, filename: str) -> str:
+        path = self._paths.get(filename)
+        if path is None:
+            path = os.path.normcase(os.path.abspath(filename)).replace("\\", "/")
+            self._paths[filename] = path
+        return path
+
+    def _frame_subsystem(self, filename: str, lineno: int) -> Optional[str]:
+        key = (filename, lineno)
+        try:
+            return self._frames[key]
+        except KeyError:
+            pass
+        path = self._normalize(filename)
+        found = next((name for name, matches in self._rules if matches(path, lineno)), None)
+        self._frames[key] = found
+        return found
+
+    def subsystem_of(self, traceback: tracemalloc.Traceback) -> str:
+        for frame in reversed(traceback):  # most recent first
+            name = self._frame_subsystem(frame.filename, frame.lineno)
+            if name is not None:
+                return name
+        return "other"
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+        if self._last is None:
+            self._last = self._snapshot()
+
+    def stop(self):
+        self._last = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot()
+
+    def diff(self, top: int = 15) -> Dict[str, Any]:
+        """Diff against the previous window: totals per subsystem plus the `top` biggest movers."""
+        current = self._snapshot()
+        previous, self._last = self._last, current
+        if previous is None:
+            previous = current
+        stats = current.compare_to(previous, "traceback")
+        by_subsystem: Dict[str, Dict[str, int]] = {}
+        movers = []
+        for stat in stats:
+            if stat.traceback[-1].filename in self._ignore:
+                continue
+            name = self.subsystem_of(stat.traceback)
+            agg = by_subsystem.setdefault(name, {"size": 0, "size_diff": 0, "count": 0, "count_diff": 0})
+            agg["size"] += stat.size
+            agg["size_diff"] += stat.size_diff
+            agg["count"] += stat.count
+            agg["count_diff"] += stat.count_diff
+            movers.append((name, stat))
+        movers.sort(key=lambda m: abs(m[1].size_diff), reverse=True)
+        traced, peak = tracemalloc.get_traced_memory()
+        return {"traced": traced, "peak": peak, "subsystems": by_subsystem, "top": movers[:top]}
+
+# -------------------------
+# Profiler (orchestration + rotating dumps)
+# -------------------------
+def _kib(n: int) -> str:
+    return f"{n / 1024:+.1f} KiB" if n else "0.0 KiB"
+
+class Profiler:
+    """
+    Periodic memory + CPU profiling with rotating dumps in `out_dir`:
+
+        mem-<timestamp>.txt     tracemalloc diff for the window, per subsystem
+        cpu-<timestamp>.folded  collapsed on-CPU stacks for the window (flamegraph.pl / speedscope);
+                                wall-<timestamp>.folded where per-thread CPU time isn't available
+
+    Only the newest `keep` files of each kind are kept. start()/stop()/toggle() may be
+    called from any thread; a signal handler must go through install_signal_toggle().
+    """
+
+    def __init__(self, out_dir: str = "./profiles", interval: float = 60.0, keep: int = 10,
+                 sample_interval: float = 0.01, nframes: int = 12):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.keep = keep
+        self.sample_interval = sample_interval
+        self.memory = MemoryTracker(nframes=nframes)
+        self.sampler = StackSampler(interval=sample_interval)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()          # guards dump()
+        self._toggle_lock = threading.Lock()   # guards the enabled state below
+        self._enabled = False
+        self._generation = 0                   # bumped by every start()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._window_start = 0.0
+        self._wakeup_w: Optional[int] = None  # write end of the signal -> toggler thread pipe
+
+    def add_subsystem(self, name: str, *targets: Any):
+        self.memory.add_subsystem(name, *targets)
+
+    def add_gauge(self, name: str, fn: Callable[[], Any]):
+        """A value reported in every memory dump (e.g. number of threads, memory entries)."""
+        self._gauges[name] = fn
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def start(self):
+        with self._toggle_lock:
+            self._enable()
+
+    def _enable(self):
+        """Start a session. Caller holds _toggle_lock."""
+        if self._enabled:
+            return
+        self._enabled = True
+        self._generation += 1
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.memory.start()
+        # fresh sampler/stop event per session, so a still-finishing previous session can't touch them
+        self.sampler = StackSampler(interval=self.sample_interval)
+        self.sampler.start()
+        self._window_start = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="sophie-profiler", daemon=True)
+        self._thread.start()
+        log.info("Profiling enabled (every %ss -> %s)", self.interval, self.out_dir)
+
+    def stop(self):
+        """Disable profiling and write the final dump before returning."""
+        with self._toggle_lock:
+            session = self._disable()
+        if session is not None:
+            self._finish(*session)
+
+    def toggle(self):
+        """Flip profiling on/off without blocking: the slow part of stopping runs on a helper thread."""
+        with self._toggle_lock:
+            if not self._enabled:
+                self._enable()
+                return
+            session = self._disable()
+        threading.Thread(target=self._finish, args=session, name="sophie-profiler-stop", daemon=True).start()
+
+    def _disable(self) -> Optional[Tuple[int, threading.Thread, "StackSampler"]]:
+        """End the current session and return it for _finish(). Caller holds _toggle_lock."""
+        if not self._enabled:
+            return None
+        self._enabled = False
+        self._stop.set()
+        session = (self._generation, self._thread, self.sampler)
+        self._thread = None
+        log.info("Profiling disabled")
+        return session
+
+    def _finish(self, generation: int, thread: threading.Thread, sampler: "StackSampler"):
+        """Join the session's dump thread, write its final dump and stop tracemalloc unless restarted."""
+        thread.join()
+        sampler.stop()
+        with self._toggle_lock:
+            restarted = self._generation != generation
+        with self._lock:
+            # if profiling was switched back on, the memory window simply continues into the new session
+            self.dump(sampler, memory=not restarted)
+        with self._toggle_lock:
+            if self._generation == generation and not self._enabled:
+                self.memory.stop()
+
+    def install_signal_toggle(self) -> Optional[int]:
+        """
+        Toggle profiling on SIGUSR1 (SIGBREAK / Ctrl+Break on Windows). Returns the signal used.
+        The handler only writes a byte to a pipe; a "sophie-profiler-toggle" thread reads it and
+        calls toggle(), so no lock is ever taken inside the handler (signals can nest).
+        """
+        signum = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if signum is None:
+            return None
+        if self._wakeup_w is None:
+            r, w = os.pipe()
+            try:
+                os.set_blocking(w, False)
+            except OSError:  # Windows pipes before 3.12; a full pipe is not a realistic concern there
+                pass
+            threading.Thread(target=self._toggler, args=(r,), name="sophie-profiler-toggle", daemon=True).start()
+            self._wakeup_w = w
+        try:
+            signal.signal(signum, self._on_signal)
+        except ValueError:  # not in the main thread
+            return None
+        return signum
+
+    def _on_signal(self, signum, frame):
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except OSError:  # pipe full: plenty of toggles already pending
+            pass
+
+    def _toggler(self, fd: int):
+        while True:
+            try:
+                pending = os.read(fd, 64)
+            except OSError:
+                return
+            if not pending:
+                return
+            for _ in pending:
+                try:
+                    self.toggle()
+                except Exception as e:
+                    log.exception("Profiler toggle failed: %s", e)
+
+    def _run(self, stop: threading.Event):
+        sampler = self.sampler
+        while not stop.wait(self.interval):
+            try:
+                with self._lock:
+                    self.dump(sampler)
+            except Exception as e:
+                log.exception("Profiler dump failed: %s", e)
+
+    def dump(self, sampler: Optional["StackSampler"] = None, memory: bool = True):
+        """Write the current window's memory diff and CPU stacks, then rotate old dumps."""
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        if memory:
+            # a CPU-only dump (stop racing a restart) leaves the memory window running
+            window, self._window_start = now - self._window_start, now
+            self._write_memory(os.path.join(self.out_dir, f"mem-{stamp}.txt"), window)
+        sampler = sampler or self.sampler
+        self._write_cpu(os.path.join(self.out_dir, f"{sampler.clock}-{stamp}.folded"), sampler)
+        for prefix in ("mem-", "cpu-", "wall-"):
+            self._rotate(prefix)
+
+    def _write_memory(self, path: str, window: float):
+        d = self.memory.diff()
+        lines = [f"# SophieAI memory diff over {window:.1f}s — traced {d['traced'] / 1024:.1f} KiB, peak {d['peak'] / 1024:.1f} KiB"]
+        for name, fn in self._gauges.items():
+            try:
+                value = fn()
+            except Exception as e:
+                value = f"error: {e}"
+            lines.append(f"# {name} = {value}")
+        lines.append("")
+        lines.append(f"{'subsystem':<12} {'size_diff':>14} {'size':>14} {'blocks_diff':>12}")
+        for name, agg in sorted(d["subsystems"].items(), key=lambda kv: kv[1]["size_diff"], reverse=True):
+            lines.append(f"{name:<12} {_kib(agg['size_diff']):>14} {agg['size'] / 1024:>10.1f} KiB {agg['count_diff']:>+12}")
+        lines.append("")
+        lines.append("Top allocation sites by change:")
+        for name, stat in d["top"]:
+            frame = stat.traceback[-1]
+            lines.append(f"  {_kib(stat.size_diff):>14} ({stat.count_diff:+} blocks) {frame.filename}:{frame.lineno} [{name}]")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _write_cpu(self, path: str, sampler: "StackSampler"):
+        counts = sampler.drain()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+    def _rotate(self, prefix: str):
+        try:
+            names = sorted(n for n in os.listdir(self.out_dir) if n.startswith(prefix))
+        except OSError:
+            return
+        for name in names[:-self.keep] if self.keep > 0 else []:
+            try:
+                os.remove(os.path.join(self.out_dir, name))
+            except OSError:
+                pass
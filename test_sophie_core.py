@@ -0,0 +1,262 @@
+"""Tests for the shared command core, driven through FakeBackend (no Android/Kivy needed)."""
+
+import threading
+
+import pytest
+
+import sophie_core
+from sophie_core import (
+    AppIndex, CommandPipeline, CommandRouter, FakeBackend, HeadlessUI, MobileAssistant, TTLCache, get_weather,
+    percentile,
+)
+
+
+class UntrackedBackend(FakeBackend):
+    """A device that can't list changed packages (DeviceBackend default / Android < 8.0)."""
+
+    def changed_packages(self, since):
+        return since, None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_assistant(apps=None, backend_cls=FakeBackend, clock=None):
+    backend = backend_cls(apps or {})
+    assistant = MobileAssistant(backend, weather=lambda: "Sunny.")
+    if clock is not None:
+        assistant.apps.clock = clock
+    return assistant, backend
+
+
+# -------------------------
+# CommandRouter
+# -------------------------
+def test_router_first_match_wins_in_registration_order():
+    r = CommandRouter()
+    r.add("wifi_on", "turn on wifi", handler=lambda t, m: "wifi")
+    r.add("open", "open", handler=lambda t, m: "open")
+    assert r.dispatch("please turn on wifi") == "wifi"
+    assert r.dispatch("open camera") == "open"
+
+
+def test_router_prefix_and_default():
+    r = CommandRouter()
+    r.add("search", "search ", handler=lambda t, m: "search", prefix=True)
+    assert r.dispatch("Search cats") == "search"
+    assert r.dispatch("please search cats", default="none") == "none"
+
+
+def test_mobile_wifi_is_not_routed_to_open():
+    assistant, backend = make_assistant({"com.wifi": "Wifi Analyzer"})
+    assistant.process_command("turn on wifi")
+    assert backend.calls == [("set_wifi", True)]
+    assert backend.spoken == ["WiFi enabled"]
+
+
+def test_mobile_unknown_command():
+    assistant, backend = make_assistant()
+    assistant.process_command("sing me a song")
+    assert backend.spoken == ["I'm still learning!"]
+
+
+# -------------------------
+# AppIndex
+# -------------------------
+def test_find_order_exact_prefix_substring_fuzzy():
+    backend = FakeBackend({
+        "com.cam.pro": "Camera Pro",
+        "com.cam": "Camera",
+        "com.my.cam": "My Camera",
+        "com.chrome": "Chrome",
+    })
+    index = AppIndex(backend)
+    index.refresh()
+    assert index.find("camera") == ("com.cam", "Camera")            # exact beats prefix
+    assert index.find("camera p") == ("com.cam.pro", "Camera Pro")  # prefix
+    assert index.find("my cam") == ("com.my.cam", "My Camera")      # prefix
+    assert index.find("y camera") == ("com.my.cam", "My Camera")    # substring
+    assert index.find("crome") == ("com.chrome", "Chrome")          # fuzzy
+    assert index.find("zzz") is None
+
+
+def test_shared_label_survives_uninstall_of_one_package():
+    backend = FakeBackend({"com.a.notes": "Notes", "com.b.notes": "Notes"})
+    index = AppIndex(backend)
+    index.refresh()
+    first, _ = index.find("notes")
+    backend.uninstall(first)
+    index.refresh()
+    remaining = ({"com.a.notes", "com.b.notes"} - {first}).pop()
+    assert index.find("notes") == (remaining, "Notes")
+
+
+def test_incremental_refresh_install_and_uninstall():
+    assistant, backend = make_assistant({"com.cam": "Camera"})
+    assistant.process_command("open camera")
+    backend.install("com.calc", "Calculator")
+    assistant.process_command("open calculator")
+    backend.uninstall("com.cam")
+    assistant.process_command("open camera")
+    assert backend.spoken == ["Opening Camera", "Opening Calculator", "App not found"]
+    assert backend.calls == [("launch_app", "com.cam"), ("launch_app", "com.calc")]
+    assert backend.full_scans == 1
+
+
+def test_untracked_backend_rescans_on_miss():
+    clock = Clock()
+    assistant, backend = make_assistant({"com.cam": "Camera"}, UntrackedBackend, clock)
+    assistant.process_command("open camera")
+    backend.apps["com.calc"] = "Calculator"
+    clock.now += 10
+    assistant.process_command("open calculator")
+    assert backend.spoken == ["Opening Camera", "Opening Calculator"]
+    assert backend.full_scans == 2
+
+
+def test_untracked_backend_rescan_is_rate_limited():
+    clock = Clock()
+    backend = UntrackedBackend({"com.cam": "Camera"})
+    index = AppIndex(backend, rescan_interval=60.0, clock=clock)
+    assert index.refresh() is True
+    clock.now += 10
+    assert index.refresh() is False
+    clock.now += 60
+    assert index.refresh() is True
+    assert backend.full_scans == 2
+
+
+def test_untracked_backend_repeated_misses_are_rate_limited():
+    clock = Clock()
+    apps = {f"com.example.app{i}": f"App {i}" for i in range(500)}
+    assistant, backend = make_assistant(apps, UntrackedBackend, clock)
+    for _ in range(50):
+        assistant.process_command("open nonexistent thing")
+    assert backend.full_scans == 1
+    clock.now += 10
+    for _ in range(50):
+        assistant.process_command("open nonexistent thing")
+    assert backend.full_scans == 2
+    assert backend.spoken == ["App not found"] * 100
+
+
+# -------------------------
+# TTLCache / get_weather
+# -------------------------
+def test_ttl_cache_expires_with_clock():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("k", "v")
+    clock.now += 9.9
+    assert cache.get("k") == "v"
+    clock.now += 0.1
+    assert cache.get("k") is None
+
+
+def test_ttl_cache_does_not_store_failed_factory():
+    cache = TTLCache(ttl=10)
+
+    def boom():
+        raise RuntimeError("network down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("k", boom)
+    assert cache.get("k") is None
+    assert cache.get_or_set("k", lambda: "ok") == "ok"
+
+
+def test_ttl_cache_evicts_entry_closest_to_expiry():
+    clock = Clock()
+    cache = TTLCache(ttl=10, max_items=2, clock=clock)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+
+
+def test_get_weather_cache_key_ignores_case_and_whitespace(monkeypatch):
+    calls = []
+
+    def fake_fetch(city, api_key):
+        calls.append(city)
+        return f"Weather in {city}"
+
+    monkeypatch.setattr(sophie_core, "fetch_weather", fake_fetch)
+    cache = TTLCache(ttl=600)
+    assert get_weather("Pune", cache=cache) == "Weather in Pune"
+    assert get_weather("  pUNE ", cache=cache) == "Weather in Pune"
+    assert calls == ["Pune"]
+
+
+def test_get_weather_failure_is_reported_and_not_cached(monkeypatch):
+    def failing_fetch(city, api_key):
+        raise OSError("timeout")
+
+    monkeypatch.setattr(sophie_core, "fetch_weather", failing_fetch)
+    cache = TTLCache(ttl=600)
+    assert get_weather("Pune", cache=cache) == "Couldn't fetch the weather."
+    assert cache.get("pune") is None
+
+
+# -------------------------
+# CommandPipeline
+# -------------------------
+def test_pipeline_ignores_submit_while_busy():
+    ui = HeadlessUI()
+    release = threading.Event()
+    handled = []
+
+    def listen():
+        release.wait(5)
+        return "hello"
+
+    pipeline = CommandPipeline(listen, handled.append, ui.post)
+    first = pipeline.submit()
+    assert first is not None
+    assert pipeline.submit() is None
+    release.set()
+    first.result(5)
+    assert not pipeline.busy
+    assert handled == ["hello"]
+    pipeline.shutdown()
+
+
+@pytest.mark.parametrize("stage", ["listen", "handle"])
+def test_pipeline_posts_error_and_releases_busy(stage):
+    ui = HeadlessUI()
+    errors = []
+
+    def listen():
+        if stage == "listen":
+            raise ValueError("listen failed")
+        return "hello"
+
+    def handle(text):
+        raise ValueError("handle failed")
+
+    pipeline = CommandPipeline(listen, handle, ui.post, on_error=errors.append, expected=(ValueError,))
+    pipeline.submit().result(5)
+    ui.pump()
+    assert not pipeline.busy
+    assert [str(e) for e in errors] == [f"{stage} failed"]
+    assert pipeline.submit() is not None
+    pipeline.shutdown()
+
+
+# -------------------------
+# percentile
+# -------------------------
+def test_percentile_is_nearest_rank():
+    assert percentile([1.0, 9.0], 0.95) == 9.0
+    values = [float(i) for i in range(1, 11)]
+    assert percentile(values, 0.95) == 10.0
+    assert percentile(values, 0.50) == 5.0
+    assert percentile(values, 0.0) == 1.0
+    assert percentile([3.0], 0.95) == 3.0
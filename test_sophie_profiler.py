@@ -0,0 +1,151 @@
+"""Tests for the runtime profiler: session lifecycle, dump rotation, memory attribution and /proc parsing."""
+
+import os
+import signal
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+import sophie_profiler
+from sophie_profiler import MemoryTracker, Profiler, _thread_cpu_ticks
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already running")
+    p = Profiler(out_dir=str(tmp_path), interval=3600, keep=3)
+    yield p
+    p.stop()
+    for t in threading.enumerate():
+        if t.name == "sophie-profiler-stop":
+            t.join(30)
+    tracemalloc.stop()
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def make_blob():
+    return bytearray(4096)
+
+
+# -------------------------
+# Profiler sessions
+# -------------------------
+def test_off_on_off_on_tracks_generation_and_tracemalloc(profiler, tmp_path):
+    profiler.start()
+    assert profiler.enabled and profiler._generation == 1
+    assert tracemalloc.is_tracing()
+
+    profiler.stop()
+    assert not profiler.enabled
+    assert not tracemalloc.is_tracing()
+    names = os.listdir(tmp_path)
+    assert any(n.startswith("mem-") for n in names)
+    assert any(n.startswith(f"{profiler.sampler.clock}-") for n in names)
+
+    profiler.toggle()
+    assert profiler.enabled and profiler._generation == 2
+    profiler.toggle()  # final dump runs on a helper thread...
+    profiler.toggle()  # ...while profiling is already back on
+    assert profiler.enabled and profiler._generation == 3
+    stoppers = [t for t in threading.enumerate() if t.name == "sophie-profiler-stop"]
+    for t in stoppers:
+        t.join(30)
+    assert tracemalloc.is_tracing(), "finishing the old session must not stop the new one"
+
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1")
+def test_signal_toggle_goes_through_toggler_thread(profiler):
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        assert profiler.install_signal_toggle() == signal.SIGUSR1
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_for(lambda: profiler.enabled)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_for(lambda: not profiler.enabled)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_rotation_keeps_newest_files_per_prefix(profiler, tmp_path):
+    for i in range(5):
+        for prefix, ext in (("mem-", "txt"), ("cpu-", "folded"), ("wall-", "folded")):
+            (tmp_path / f"{prefix}20000101-000000-00{i}.{ext}").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    profiler.start()
+    profiler.stop()
+    names = sorted(os.listdir(tmp_path))
+    assert "notes.txt" in names
+    for prefix in ("mem-", "cpu-", "wall-"):
+        kept = [n for n in names if n.startswith(prefix)]
+        assert len(kept) == 3
+    fresh = [n for n in names if not n.startswith(("notes", "mem-2000", "cpu-2000", "wall-2000"))]
+    assert len(fresh) == 2  # this session's final mem + cpu/wall dump survived rotation
+
+
+# -------------------------
+# MemoryTracker attribution
+# -------------------------
+@pytest.fixture
+def tracing():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc already running")
+    tracemalloc.start(12)
+    yield
+    tracemalloc.stop()
+
+
+def test_subsystem_of_by_function_line_span(tracing):
+    tracker = MemoryTracker()
+    tracker.add_subsystem("blob", make_blob)
+    inside = make_blob()
+    outside = bytearray(4096)
+    assert tracker.subsystem_of(tracemalloc.get_object_traceback(inside)) == "blob"
+    assert tracker.subsystem_of(tracemalloc.get_object_traceback(outside)) == "other"
+
+
+def test_subsystem_of_by_path_fragment(tracing):
+    tracker = MemoryTracker()
+    tracker.add_subsystem("web", "requests/")
+    blob = bytearray(4096)
+    assert tracker.subsystem_of(tracemalloc.get_object_traceback(blob)) == "other"
+    tracker.add_subsystem("tests", "test_sophie_profiler")  # clears cached per-frame results
+    assert tracker.subsystem_of(tracemalloc.get_object_traceback(blob)) == "tests"
+
+
+def test_subsystem_of_prefers_most_recent_frame(tracing):
+    tracker = MemoryTracker()
+    tracker.add_subsystem("tests", test_subsystem_of_prefers_most_recent_frame)
+    tracker.add_subsystem("blob", make_blob)
+    blob = make_blob()
+    assert tracker.subsystem_of(tracemalloc.get_object_traceback(blob)) == "blob"
+
+
+# -------------------------
+# /proc/self/task/<tid>/stat parsing
+# -------------------------
+def test_thread_cpu_ticks_parses_utime_and_stime(tmp_path, monkeypatch):
+    monkeypatch.setattr(sophie_profiler, "PROC_TASKS", str(tmp_path))
+    (tmp_path / "123").mkdir()
+    fields = " ".join(str(n) for n in range(4, 14))  # fields 4..13
+    (tmp_path / "123" / "stat").write_bytes(f"123 (odd) name (x)) S {fields} 111 222 0 0 20 0 1 0\n".encode())
+    assert _thread_cpu_ticks(123) == 333
+    assert _thread_cpu_ticks(456) is None
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/task"), reason="needs /proc")
+def test_thread_cpu_ticks_reads_own_thread():
+    assert isinstance(_thread_cpu_ticks(threading.get_native_id()), int)
@@ -0,0 +1,91 @@
+"""Tests for the desktop voice input path: audio sources, the transcript stub recognizer and TurnStats."""
+
+import io
+import wave
+
+import pytest
+
+pytest.importorskip("speech_recognition")
+sophie = pytest.importorskip("sophie")
+
+
+def write_wav(path, seconds=0.1, rate=16000):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    # written out of order on purpose; playback is by name
+    write_wav(tmp_path / "02_cmd.wav")
+    (tmp_path / "02_cmd.txt").write_text("what time is it\n", encoding="utf-8")
+    write_wav(tmp_path / "01_wake.wav")
+    (tmp_path / "01_wake.txt").write_text("sophie", encoding="utf-8")
+    write_wav(tmp_path / "03_noise.wav")  # no sidecar
+    (tmp_path / "notes.txt").write_text("not audio", encoding="utf-8")
+    return tmp_path
+
+
+def test_directory_corpus_plays_in_name_order_then_ends(corpus):
+    listener = sophie.SpeechListener(source=sophie.make_audio_source(str(corpus)),
+                                     backend=sophie.TranscriptStubRecognizer())
+    assert not listener.realtime
+    heard = [listener.listen_once() for _ in range(3)]
+    assert heard == ["sophie", "what time is it", ""]
+    with pytest.raises(sophie.EndOfAudio):
+        listener.listen_once()
+    assert listener.audio_seconds == pytest.approx(0.3)
+
+
+def test_single_wav_file_source(corpus):
+    source = sophie.make_audio_source(str(corpus / "02_cmd.wav"))
+    listener = sophie.SpeechListener(source=source, backend=sophie.TranscriptStubRecognizer())
+    assert listener.listen_once() == "what time is it"
+    with pytest.raises(sophie.EndOfAudio):
+        listener.listen_once()
+
+
+def test_missing_audio_path_is_rejected(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        sophie.make_audio_source(str(tmp_path / "missing.wav"))
+
+
+def test_stdin_pcm_chunks_are_sized_and_sample_aligned():
+    rate, width = 1000, 2
+    stream = io.BytesIO(b"\1" * 2501)
+    source = sophie.StdinPCMSource(sample_rate=rate, sample_width=width, chunk_seconds=0.5, stream=stream)
+    recognizer = sophie.sr.Recognizer()
+    sizes = [len(source.capture(recognizer).audio.frame_data) for _ in range(3)]
+    assert sizes == [1000, 1000, 500]  # last chunk trimmed from 501 to whole samples
+    with pytest.raises(sophie.EndOfAudio):
+        source.capture(recognizer)
+
+
+def test_stdin_pcm_chunk_respects_phrase_time_limit():
+    source = sophie.StdinPCMSource(sample_rate=1000, sample_width=2, chunk_seconds=4.0, stream=io.BytesIO(b"\0" * 8000))
+    utterance = source.capture(sophie.sr.Recognizer(), phrase_time_limit=0.25)
+    assert len(utterance.audio.frame_data) == 500
+    assert utterance.duration == pytest.approx(0.25)
+    assert utterance.origin is None
+
+
+def test_stub_recognizer_without_origin_is_empty():
+    audio = sophie.sr.AudioData(b"\0\0" * 10, 16000, 2)
+    assert sophie.TranscriptStubRecognizer().recognize(None, sophie.Utterance(audio)) == ""
+
+
+def test_turn_stats_summary():
+    stats = sophie.TurnStats()
+    assert stats.summary() == {"turns": 0}
+    for i in range(1, 11):
+        stats.record(i / 1000, speech_seconds=0.5)
+    summary = stats.summary()
+    assert summary["turns"] == 10
+    assert summary["p50_ms"] == 5.0
+    assert summary["p95_ms"] == 10.0
+    assert summary["max_ms"] == 10.0
+    assert summary["mean_ms"] == 5.5
+    assert summary["speech_mean_ms"] == 500.0